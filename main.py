@@ -1,17 +1,52 @@
-import discord
-from discord.ext import commands
+import time
+from contextlib import contextmanager
+
+class StartupProfiler:
+    """Mide el tiempo de importación e inicialización del bot por fases"""
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.fases = []
+
+    @contextmanager
+    def fase(self, nombre: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.fases.append((nombre, time.perf_counter() - t0))
+
+    def marcar(self, nombre: str):
+        """Registra el tiempo total transcurrido desde el arranque"""
+        self.fases.append((nombre, time.perf_counter() - self.inicio))
+
+    def reporte(self) -> str:
+        return "\n".join(f"{nombre}: {segundos * 1000:.0f} ms" for nombre, segundos in self.fases)
+
+startup_profiler = StartupProfiler()
+
+with startup_profiler.fase("import discord"):
+    import discord
+    from discord.ext import commands
+
 import os
+import sys
+import importlib.util
 from dotenv import load_dotenv
-import yt_dlp
-from collections import deque
+import aiohttp
+from collections import deque, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 import asyncio
 import traceback
 import random
 import json
+import math
+import re
 import sqlite3
-from yt_dlp import YoutubeDL
 import platform
-import psutil
+import threading
+import subprocess
+import multiprocessing
 
 # --------------------------
 # Configuración Inicial
@@ -19,6 +54,40 @@ import psutil
 
 load_dotenv()
 
+# "ready": precarga yt-dlp en segundo plano tras READY; "lazy": solo en la primera extracción
+EXTRACTOR_PRELOAD = os.getenv("EXTRACTOR_PRELOAD", "ready")
+
+_yt_dlp = None
+_psutil = None
+
+def get_yt_dlp():
+    """Importa yt-dlp (y su registro de extractores) la primera vez que se necesita"""
+    global _yt_dlp
+    if _yt_dlp is None:
+        with startup_profiler.fase("import yt_dlp"):
+            import yt_dlp
+        _yt_dlp = yt_dlp
+    return _yt_dlp
+
+# NumPy es opcional: sin ella no hay recorte de silencios ni control de volumen
+NUMPY_AVAILABLE = importlib.util.find_spec("numpy") is not None
+_numpy = None
+
+def get_numpy():
+    global _numpy
+    if _numpy is None:
+        import numpy
+        _numpy = numpy
+    return _numpy
+
+def get_psutil():
+    global _psutil
+    if _psutil is None:
+        with startup_profiler.fase("import psutil"):
+            import psutil
+        _psutil = psutil
+    return _psutil
+
 intents = discord.Intents.default()
 intents.message_content = True
 intents.voice_states = True
@@ -28,12 +97,16 @@ bot = commands.Bot(command_prefix="!", intents=intents)
 # Configuración de audio
 FFMPEG_OPTIONS = {
     'before_options': '-reconnect 1 -reconnect_streamed 1 -reconnect_delay_max 5 -probesize 32M -analyzeduration 32M -fflags +discardcorrupt',
-    'options': '-vn -c:a libopus -b:a 192k -ar 48000 -ac 2 -af "loudnorm=I=-16:TP=-1.5:LRA=11:measured_I=-16:measured_TP=-1.5:measured_LRA=11:measured_thresh=-30:offset=0,acompressor=threshold=-20dB:ratio=4:attack=50:release=200:makeup=3" -application lowdelay',
+    'options': '-vn -c:a libopus -ar 48000 -ac 2 -application lowdelay',
     'executable': 'ffmpeg',
 }
 
+# Filtros de audio; el gobernador de codificación decide cuáles aplicar
+FILTRO_LOUDNORM = 'loudnorm=I=-16:TP=-1.5:LRA=11:measured_I=-16:measured_TP=-1.5:measured_LRA=11:measured_thresh=-30:offset=0'
+FILTRO_COMPRESOR = 'acompressor=threshold=-20dB:ratio=4:attack=50:release=200:makeup=3'
+
 # Configuración optimizada para yt-dlp
-def get_ydl_opts():
+def get_ydl_opts(player_client: str = 'android'):
     return {
         'format': 'bestaudio/best',
         'quiet': True,
@@ -47,7 +120,7 @@ def get_ydl_opts():
         'extractor_args': {
             'youtube': {
                 'skip': ['dash', 'hls'],
-                'player_client': ['android'],
+                'player_client': [player_client],
                 'player_skip': ['configs', 'webpage']
             }
         },
@@ -73,8 +146,6 @@ def increase_file_limits():
     else:
         print("En Windows, los límites de archivos se manejan automáticamente")
 
-increase_file_limits()
-
 # --------------------------
 # Sistema de Colas
 # --------------------------
@@ -84,6 +155,12 @@ class MusicQueue:
         self.queues = {}
         self.current = {}
         self.is_playing = {}
+        self.sources = {}
+        self.pending_seek = {}
+        self.resume_attempts = {}
+        self.volumes = {}
+        # Sube en cada clear(); las importaciones en curso la comparan para detenerse
+        self.generations = {}
 
     def get_queue(self, guild_id: int) -> deque:
         if guild_id not in self.queues:
@@ -98,6 +175,11 @@ class MusicQueue:
             del self.current[guild_id]
         if guild_id in self.is_playing:
             self.is_playing[guild_id] = False
+        self.sources.pop(guild_id, None)
+        self.pending_seek.pop(guild_id, None)
+        self.resume_attempts.pop(guild_id, None)
+        self.generations[guild_id] = self.generations.get(guild_id, 0) + 1
+        encoding_governor.forget(guild_id)
 
     def set_playing(self, guild_id: int, status: bool):
         self.is_playing[guild_id] = status
@@ -105,6 +187,10 @@ class MusicQueue:
     def get_playing(self, guild_id: int) -> bool:
         return self.is_playing.get(guild_id, False)
 
+    def get_position(self, guild_id: int) -> float:
+        source = self.sources.get(guild_id)
+        return source.position if source else 0.0
+
 music_queue = MusicQueue()
 # --------------------------
 # Clase del Reproductor
@@ -123,43 +209,942 @@ class MusicPlayer:
     @classmethod
     async def get_audio_source(cls, query: str) -> dict:
         try:
-            ydl_opts = get_ydl_opts()
+            if not query.startswith(('http://', 'https://')):
+                query = f"ytsearch:{query}"
+
+            info = await hedged_extractor.extract(query)
             
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                if not query.startswith(('http://', 'https://')):
-                    query = f"ytsearch:{query}"
-                
-                info = await bot.loop.run_in_executor(None, lambda: ydl.extract_info(query, download=False))
-                
-                if 'entries' in info:
-                    info = info['entries'][0]
-                
-                return {
-                    'url': info['url'],
-                    'title': info.get('title', 'Audio desconocido'),
-                    'duration': info.get('duration', 0),
-                    'thumbnail': info.get('thumbnail', 'https://i.imgur.com/8QZQZ.png'),
-                    'requested_by': 'Solicitado'
-                }
+            if 'entries' in info:
+                info = info['entries'][0]
+            
+            return {
+                'id': info.get('id'),
+                'url': info['url'],
+                'webpage_url': info.get('webpage_url'),
+                'title': info.get('title', 'Audio desconocido'),
+                'duration': info.get('duration', 0),
+                'thumbnail': info.get('thumbnail', 'https://i.imgur.com/8QZQZ.png'),
+                'requested_by': 'Solicitado'
+            }
         except Exception as e:
             print(f"Error al obtener audio: {traceback.format_exc()}")
             return None
 
+# --------------------------
+# Extracción con Respaldo en Paralelo
+# --------------------------
+
+# Cliente principal y alternativo de YouTube para yt-dlp
+EXTRACTION_STRATEGIES = ['android', 'ios']
+# Plazo antes de lanzar el respaldo: p90 de la estrategia principal, acotado
+HEDGE_DEFAULT_DEADLINE = 3.0
+HEDGE_MIN_DEADLINE = 1.0
+HEDGE_MAX_DEADLINE = 8.0
+HEDGE_MIN_SAMPLES = 20
+# Como máximo un 10% de las últimas extracciones puede lanzar respaldo
+HEDGE_MAX_RATE = 0.1
+HEDGE_WINDOW = 100
+# Límites superiores (s) de los cubos del histograma de latencias
+LATENCY_BUCKETS = [0.5, 1, 2, 4, 8, 16, float('inf')]
+
+class HedgedExtractor:
+    """Lanza una segunda extracción con otro cliente si la primera tarda más de lo habitual"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencias = {s: deque(maxlen=HEDGE_WINDOW) for s in EXTRACTION_STRATEGIES}
+        self.histogramas = {s: [0] * len(LATENCY_BUCKETS) for s in EXTRACTION_STRATEGIES}
+        self.errores = {s: 0 for s in EXTRACTION_STRATEGIES}
+        self.victorias = {s: 0 for s in EXTRACTION_STRATEGIES}
+        self.recientes = deque(maxlen=HEDGE_WINDOW)
+
+    def deadline(self) -> float:
+        with self.lock:
+            muestras = sorted(self.latencias[EXTRACTION_STRATEGIES[0]])
+        if len(muestras) < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT_DEADLINE
+        p90 = muestras[int(0.9 * (len(muestras) - 1))]
+        return min(max(p90, HEDGE_MIN_DEADLINE), HEDGE_MAX_DEADLINE)
+
+    def hedge_rate(self) -> float:
+        return sum(self.recientes) / len(self.recientes) if self.recientes else 0.0
+
+    def _registrar(self, strategy: str, latencia: float):
+        with self.lock:
+            self.latencias[strategy].append(latencia)
+            bucket = next(i for i, limite in enumerate(LATENCY_BUCKETS) if latencia <= limite)
+            self.histogramas[strategy][bucket] += 1
+
+    def _extraer(self, strategy: str, query: str) -> dict:
+        """Se ejecuta en un hilo del executor"""
+        yt_dlp = get_yt_dlp()
+        t0 = time.perf_counter()
+        try:
+            with yt_dlp.YoutubeDL(get_ydl_opts(strategy)) as ydl:
+                info = ydl.extract_info(query, download=False)
+        except Exception:
+            with self.lock:
+                self.errores[strategy] += 1
+            raise
+        self._registrar(strategy, time.perf_counter() - t0)
+        return info
+
+    async def extract(self, query: str) -> dict:
+        primaria, alternativa = EXTRACTION_STRATEGIES
+        tareas = {asyncio.ensure_future(bot.loop.run_in_executor(None, self._extraer, primaria, query)): primaria}
+
+        done, _ = await asyncio.wait(tareas, timeout=self.deadline())
+        lanzar_respaldo = not done and self.hedge_rate() < HEDGE_MAX_RATE
+        self.recientes.append(lanzar_respaldo)
+        if lanzar_respaldo:
+            tareas[asyncio.ensure_future(bot.loop.run_in_executor(None, self._extraer, alternativa, query))] = alternativa
+
+        # Gana el primer intento correcto; el perdedor se cancela y su resultado se descarta
+        pendientes = set(tareas)
+        error = None
+        while pendientes:
+            done, pendientes = await asyncio.wait(pendientes, return_when=asyncio.FIRST_COMPLETED)
+            for tarea in done:
+                if tarea.exception() is None:
+                    for perdedora in pendientes:
+                        perdedora.cancel()
+                    self.victorias[tareas[tarea]] += 1
+                    return tarea.result()
+                error = tarea.exception()
+        raise error
+
+hedged_extractor = HedgedExtractor()
+
+# --------------------------
+# Gobernador de Codificación
+# --------------------------
+
+# Niveles de calidad, de mayor a menor coste: (nombre, CPU máxima %, bitrate máximo kbps, complejidad opus, filtros)
+NIVELES_CODIFICACION = [
+    ('completo', 60, 192, 10, [FILTRO_LOUDNORM, FILTRO_COMPRESOR]),
+    ('reducido', 80, 128, 5, [FILTRO_COMPRESOR]),
+    ('minimo', 101, 96, 0, []),
+]
+
+# Segundos entre muestras de CPU del host
+CPU_SAMPLE_INTERVAL = 3
+
+class EncodingGovernor:
+    """Elige bitrate, complejidad y filtros de cada stream nuevo según el canal y la carga del host"""
+
+    def __init__(self):
+        self.decisions = {}
+        self.cpu = 0.0
+
+    async def run(self):
+        """Muestrea la CPU del host a intervalo fijo; las decisiones leen el último valor"""
+        # La primera lectura de psutil siempre es 0.0; se descarta aquí
+        psutil = get_psutil()
+        psutil.cpu_percent(interval=None)
+        while not bot.is_closed():
+            await asyncio.sleep(CPU_SAMPLE_INTERVAL)
+            self.cpu = psutil.cpu_percent(interval=None)
+
+    def host_load(self) -> float:
+        """Uso de CPU medio durante el último intervalo de muestreo"""
+        return self.cpu
+
+    def decide(self, guild_id: int, channel_bitrate: int) -> dict:
+        load = self.host_load()
+        nombre, _, max_kbps, complejidad, filtros = next(n for n in NIVELES_CODIFICACION if load < n[1])
+        # Por encima del bitrate del canal Discord descarta los bits extra
+        channel_kbps = max(channel_bitrate // 1000, 8) if channel_bitrate else max_kbps
+        decision = {
+            'nivel': nombre,
+            'bitrate': min(max_kbps, channel_kbps),
+            'complejidad': complejidad,
+            'filtros': filtros,
+            'cpu': load,
+        }
+        self.decisions[guild_id] = decision
+        return decision
+
+    def ffmpeg_options(self, decision: dict) -> str:
+        options = f"{FFMPEG_OPTIONS['options']} -b:a {decision['bitrate']}k -compression_level {decision['complejidad']}"
+        if decision['filtros']:
+            options += f' -af "{",".join(decision["filtros"])}"'
+        return options
+
+    def forget(self, guild_id: int):
+        self.decisions.pop(guild_id, None)
+
+encoding_governor = EncodingGovernor()
+
+# --------------------------
+# Control de Volumen
+# --------------------------
+
+# Frames PCM que entrega el decodificador opus: 20 ms, 48 kHz, estéreo, s16
+PCM_FRAME_BYTES = discord.opus.Decoder.FRAME_SIZE
+
+class GainStage:
+    """Escala frames PCM s16 estéreo con NumPy, con una rampa lineal al cambiar el volumen"""
+
+    def __init__(self, volume: float = 1.0):
+        self.target = volume
+        self.current = volume
+
+    def set_volume(self, volume: float):
+        self.target = volume
+
+    @property
+    def passthrough(self) -> bool:
+        return self.target == 1.0 and self.current == 1.0
+
+    def apply(self, pcm: bytes) -> bytes:
+        np = get_numpy()
+        samples = np.frombuffer(pcm, dtype=np.int16).reshape(-1, 2)
+        target = self.target
+        if target != self.current:
+            # La rampa dura un frame: el cambio se oye en 20 ms y sin clics
+            gain = np.linspace(self.current, target, len(samples), dtype=np.float32)[:, None]
+            self.current = target
+        else:
+            gain = np.float32(target)
+        out = samples * gain
+        np.clip(out, -32768, 32767, out=out)
+        return out.astype(np.int16).tobytes()
+
+def benchmark_gain_stage(frames: int = 5000) -> str:
+    """Compara el coste por frame de salir de la ruta opus directa con el escalado muestra a muestra en Python"""
+    import array
+
+    np = get_numpy()
+    pcm = np.random.randint(-20000, 20000, PCM_FRAME_BYTES // 2, dtype=np.int16).tobytes()
+    resultados = []
+
+    stage = GainStage(0.5)
+    t0 = time.perf_counter()
+    for i in range(frames):
+        if i % 50 == 0:
+            stage.set_volume(0.3 if stage.target == 0.5 else 0.5)
+        stage.apply(pcm)
+    resultados.append(("solo ganancia numpy", (time.perf_counter() - t0) / frames))
+
+    # Lo que cuesta de verdad un frame con volumen distinto de 100%:
+    # decodificar el paquete opus, escalar y volver a codificar
+    if opus_disponible():
+        encoder = discord.opus.Encoder()
+        decoder = discord.opus.Decoder()
+        paquete = encoder.encode(pcm, encoder.SAMPLES_PER_FRAME)
+        t0 = time.perf_counter()
+        for _ in range(frames):
+            encoder.encode(stage.apply(decoder.decode(paquete, fec=False)), encoder.SAMPLES_PER_FRAME)
+        resultados.append(("decodificar + ganancia + codificar", (time.perf_counter() - t0) / frames))
+    else:
+        resultados.append(("decodificar + ganancia + codificar", None))
+
+    muestras_py = frames // 10
+    t0 = time.perf_counter()
+    for _ in range(muestras_py):
+        samples = array.array('h', pcm)
+        array.array('h', (max(-32768, min(32767, int(x * 0.5))) for x in samples)).tobytes()
+    resultados.append(("python puro", (time.perf_counter() - t0) / muestras_py))
+
+    presupuesto = FRAME_SECONDS * 1e6
+    return "\n".join(
+        f"{nombre}: {segundos * 1e6:.1f} µs/frame ({segundos * 1e6 / presupuesto:.2%} de un frame de 20 ms)"
+        if segundos is not None else f"{nombre}: libopus no disponible"
+        for nombre, segundos in resultados
+    )
+
+# --------------------------
+# Posición de Reproducción
+# --------------------------
+
+# Duración de cada paquete que entrega el reproductor (20 ms)
+FRAME_SECONDS = discord.opus.Encoder.FRAME_LENGTH / 1000
+# Reintentos para reanudar una pista que se cortó antes de terminar
+MAX_RESUME_ATTEMPTS = 3
+# Margen final en el que un corte se considera fin normal de la pista
+RESUME_MARGIN = 5
+
+class PositionTrackedSource(discord.AudioSource):
+    """Envuelve una fuente de audio y cuenta los frames leídos para conocer la posición"""
+
+    def __init__(self, original: discord.AudioSource, start_offset: float = 0.0):
+        self.original = original
+        self.start_offset = start_offset
+        self.frames = 0
+        self.reached_eof = False
+        # Posición en la que termina el audio útil (silencio final recortado)
+        self.end_at = None
+        self.gain = GainStage()
+        self.decoder = None
+        self.sent_opus = original.is_opus()
+        # Momento del último frame entregado; lo vigila el watchdog
+        self.last_frame_at = time.monotonic()
+        self.stalled = False
+
+    @property
+    def position(self) -> float:
+        return self.start_offset + self.frames * FRAME_SECONDS
+
+    def read(self) -> bytes:
+        if self.end_at is not None and self.position >= self.end_at:
+            self.reached_eof = True
+            return b''
+        data = self.original.read()
+        if data:
+            self.frames += 1
+            self.last_frame_at = time.monotonic()
+        else:
+            self.reached_eof = True
+
+        # Al 100% los paquetes opus pasan sin tocar; con otro volumen se decodifican,
+        # se escalan y el VoiceClient los vuelve a codificar
+        self.sent_opus = self.original.is_opus() and self.gain.passthrough
+        if data and not self.sent_opus:
+            if self.original.is_opus():
+                if self.decoder is None:
+                    self.decoder = discord.opus.Decoder()
+                data = self.decoder.decode(data, fec=False)
+            data = self.gain.apply(data)
+        return data
+
+    def is_opus(self) -> bool:
+        # El reproductor consulta esto después de cada read(); debe coincidir con el último frame
+        return self.sent_opus
+
+    def cleanup(self):
+        self.original.cleanup()
+
+def formatear_tiempo(segundos: float) -> str:
+    segundos = int(max(segundos, 0))
+    horas, resto = divmod(segundos, 3600)
+    minutos, segs = divmod(resto, 60)
+    if horas:
+        return f"{horas}:{minutos:02}:{segs:02}"
+    return f"{minutos}:{segs:02}"
+
+def parsear_tiempo(texto: str) -> float:
+    """Convierte `90`, `1:30` o `1:02:30` a segundos"""
+    partes = texto.strip().split(":")
+    if not partes or len(partes) > 3:
+        raise ValueError(f"Tiempo inválido: {texto}")
+    total = 0.0
+    for parte in partes:
+        valor = float(parte)
+        if not math.isfinite(valor) or valor < 0:
+            raise ValueError(f"Tiempo inválido: {texto}")
+        total = total * 60 + valor
+    return total
+
+async def crear_fuente(voice_client, song: dict, offset: float = 0.0) -> PositionTrackedSource:
+    """Crea la fuente FFmpeg de una canción empezando en `offset` segundos"""
+    decision = encoding_governor.decide(voice_client.guild.id, getattr(voice_client.channel, 'bitrate', 0))
+    before_options = FFMPEG_OPTIONS['before_options']
+    if offset > 0:
+        # -ss antes de -i: ffmpeg pide el rango HTTP desde el punto de salto
+        # y no decodifica nada de lo anterior
+        before_options = f"-ss {offset:.2f} -seekable 1 {before_options}"
+
+    source = await discord.FFmpegOpusAudio.from_probe(
+        song['url'],
+        before_options=before_options,
+        options=encoding_governor.ffmpeg_options(decision),
+        executable=FFMPEG_OPTIONS['executable'],
+        method='fallback'
+    )
+    tracked = PositionTrackedSource(source, offset)
+    tracked.end_at = silence_analyzer.trim_end(song)
+    volume = music_queue.volumes.get(voice_client.guild.id, 100) / 100
+    tracked.gain = GainStage(volume)
+    return tracked
+
+# --------------------------
+# Recorte de Silencios
+# --------------------------
+
+# Sin NumPy el análisis se desactiva y las pistas se reproducen completas
+SILENCE_TRIM_ENABLED = NUMPY_AVAILABLE
+SILENCE_SAMPLE_RATE = 8000
+SILENCE_WINDOW = 0.05
+SILENCE_THRESHOLD_DB = -45
+# Recortes menores que esto no compensan el salto
+SILENCE_MIN_TRIM = 0.5
+# Segundos analizados al principio y al final de cada pista
+SILENCE_SCAN_SECONDS = 30
+# Las pistas sin duración (directos) o más largas que esto no se analizan
+SILENCE_MAX_DURATION = 3 * 3600
+SILENCE_WORKERS = 1
+SILENCE_MAX_BACKLOG = 4
+SILENCE_CACHE_SIZE = 2000
+
+def _decodificar_pcm(url: str, executable: str, posicion: list):
+    """Decodifica a PCM mono de baja resolución solo el tramo indicado por `posicion`"""
+    import numpy as np
+
+    proceso = subprocess.run(
+        [executable, '-nostdin', '-loglevel', 'error',
+         '-reconnect', '1', '-reconnect_streamed', '1', '-reconnect_delay_max', '5',
+         *posicion, '-i', url, '-vn', '-ac', '1', '-ar', str(SILENCE_SAMPLE_RATE), '-f', 's16le', '-'],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        timeout=120
+    )
+    return np.frombuffer(proceso.stdout, dtype=np.int16)
+
+def _ventanas_con_sonido(muestras):
+    """Índices de las ventanas cuyo RMS supera el umbral, y el número total de ventanas"""
+    import numpy as np
+
+    por_ventana = int(SILENCE_SAMPLE_RATE * SILENCE_WINDOW)
+    ventanas = len(muestras) // por_ventana
+    if ventanas == 0:
+        return np.empty(0, dtype=np.int64), 0
+    bloques = muestras[:ventanas * por_ventana].reshape(ventanas, por_ventana).astype(np.float32) / 32768.0
+    rms = np.sqrt(np.mean(np.square(bloques), axis=1))
+    return np.flatnonzero(rms > 10 ** (SILENCE_THRESHOLD_DB / 20)), ventanas
+
+def analizar_silencio(url: str, duration: float, executable: str = 'ffmpeg'):
+    """Devuelve `(inicio, fin, duración real)` del audio no silencioso de la pista.
+
+    Solo decodifica los primeros SILENCE_SCAN_SECONDS y desde SILENCE_SCAN_SECONDS
+    antes del final según la metadata hasta el final real; las pistas cortas
+    se decodifican enteras. Se ejecuta en un proceso del pool, fuera del event loop.
+    """
+    if duration <= 2 * SILENCE_SCAN_SECONDS:
+        con_sonido, ventanas = _ventanas_con_sonido(_decodificar_pcm(url, executable, []))
+        if con_sonido.size == 0:
+            return None
+        return (
+            float(con_sonido[0] * SILENCE_WINDOW),
+            float((con_sonido[-1] + 1) * SILENCE_WINDOW),
+            float(ventanas * SILENCE_WINDOW),
+        )
+
+    inicio_sonido, _ = _ventanas_con_sonido(_decodificar_pcm(url, executable, ['-t', str(SILENCE_SCAN_SECONDS)]))
+    # El final se decodifica desde un instante conocido hasta el fin real del stream:
+    # la duración de yt-dlp va en segundos enteros y suele quedarse corta
+    inicio_final = duration - SILENCE_SCAN_SECONDS
+    final_sonido, ventanas_final = _ventanas_con_sonido(_decodificar_pcm(url, executable, ['-ss', str(inicio_final)]))
+    total = inicio_final + ventanas_final * SILENCE_WINDOW
+
+    # Un tramo sin nada audible puede ser una pausa larga: no se recorta
+    inicio = float(inicio_sonido[0] * SILENCE_WINDOW) if inicio_sonido.size else 0.0
+    fin = total
+    if final_sonido.size:
+        fin = inicio_final + (final_sonido[-1] + 1) * SILENCE_WINDOW
+    return inicio, float(fin), float(total)
+
+class SilenceAnalyzer:
+    """Analiza en segundo plano el silencio inicial y final de las pistas y guarda los puntos de corte"""
+
+    def __init__(self):
+        self.cache = OrderedDict()
+        self.pending = set()
+        self.pool = None
+
+    @staticmethod
+    def track_key(song: dict) -> str:
+        return song.get('id') or song.get('url')
+
+    def submit(self, song: dict):
+        # Las canciones sin URL de stream aún (Spotify) se analizan al resolverse
+        if not SILENCE_TRIM_ENABLED or not song.get('url'):
+            return
+        duration = song.get('duration') or 0
+        if not 0 < duration <= SILENCE_MAX_DURATION:
+            return
+        key = self.track_key(song)
+        # Con el backlog lleno se descarta: la pista se reproduce sin recortar
+        if key in self.cache or key in self.pending or len(self.pending) >= SILENCE_MAX_BACKLOG:
+            return
+        if self.pool is None:
+            # spawn: hacer fork de un proceso con hilos (voz, executor) no es seguro
+            self.pool = ProcessPoolExecutor(max_workers=SILENCE_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+        self.pending.add(key)
+        future = bot.loop.run_in_executor(self.pool, analizar_silencio, song['url'], duration, FFMPEG_OPTIONS['executable'])
+        future.add_done_callback(lambda f: self._terminado(key, f))
+
+    def _terminado(self, key: str, future):
+        self.pending.discard(key)
+        if future.cancelled():
+            return
+        if future.exception():
+            print(f"Error al analizar silencio: {future.exception()}")
+            return
+
+        resultado = future.result()
+        inicio, fin = 0.0, None
+        if resultado:
+            sonido_inicio, sonido_fin, total = resultado
+            if sonido_inicio >= SILENCE_MIN_TRIM:
+                inicio = sonido_inicio
+            if total - sonido_fin >= SILENCE_MIN_TRIM:
+                fin = sonido_fin
+        self.cache[key] = (inicio, fin)
+        while len(self.cache) > SILENCE_CACHE_SIZE:
+            self.cache.popitem(last=False)
+
+        # El final también se aplica a la pista que ya está sonando
+        for guild_id, song in music_queue.current.items():
+            source = music_queue.sources.get(guild_id)
+            if source and fin is not None and self.track_key(song) == key:
+                source.end_at = fin
+
+    def trim_start(self, song: dict) -> float:
+        return self.cache.get(self.track_key(song), (0.0, None))[0]
+
+    def trim_end(self, song: dict):
+        return self.cache.get(self.track_key(song), (0.0, None))[1]
+
+silence_analyzer = SilenceAnalyzer()
+
+
+
+# --------------------------
+# Soporte de Spotify
+# --------------------------
+
+# Se pueden apuntar a un servidor local para pruebas
+SPOTIFY_API_URL = os.getenv("SPOTIFY_API_URL", "https://api.spotify.com/v1")
+SPOTIFY_TOKEN_URL = os.getenv("SPOTIFY_TOKEN_URL", "https://accounts.spotify.com/api/token")
+SPOTIFY_URL_RE = re.compile(r"(?:open\.spotify\.com/(?:intl-[\w-]+/)?|spotify:)(track|album|playlist)[/:]([A-Za-z0-9]+)")
+# Búsquedas simultáneas en YouTube al encolar álbumes y playlists
+SPOTIFY_MATCH_CONCURRENCY = 4
+
+class SpotifyClient:
+    """Lee metadatos de la API web de Spotify con credenciales de cliente"""
+
+    def __init__(self):
+        self.client_id = os.getenv("SPOTIFY_CLIENT_ID")
+        self.client_secret = os.getenv("SPOTIFY_CLIENT_SECRET")
+        self.token = None
+        self.token_expires = 0.0
+        self.session = None
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.client_id and self.client_secret)
+
+    async def _token(self) -> str:
+        if self.token and time.monotonic() < self.token_expires:
+            return self.token
+        async with self.session.post(
+            SPOTIFY_TOKEN_URL,
+            data={'grant_type': 'client_credentials'},
+            auth=aiohttp.BasicAuth(self.client_id, self.client_secret)
+        ) as resp:
+            resp.raise_for_status()
+            data = await resp.json()
+        self.token = data['access_token']
+        # Renovar un minuto antes de que caduque
+        self.token_expires = time.monotonic() + data.get('expires_in', 3600) - 60
+        return self.token
+
+    async def _get(self, url: str) -> dict:
+        if self.session is None:
+            self.session = aiohttp.ClientSession()
+        if not url.startswith(('http://', 'https://')):
+            url = f"{SPOTIFY_API_URL}{url}"
+        headers = {'Authorization': f"Bearer {await self._token()}"}
+        async with self.session.get(url, headers=headers) as resp:
+            resp.raise_for_status()
+            return await resp.json()
+
+    @staticmethod
+    def _metadata(track: dict, album: dict = None) -> dict:
+        album = track.get('album') or album or {}
+        images = album.get('images') or []
+        return {
+            'spotify_id': track['id'],
+            'title': track['name'],
+            'artists': ", ".join(a['name'] for a in track.get('artists', [])),
+            'duration': (track.get('duration_ms') or 0) // 1000,
+            'thumbnail': images[0]['url'] if images else None,
+        }
+
+    async def tracks(self, kind: str, spotify_id: str):
+        """Genera los metadatos de las canciones página a página, sin esperar al listado completo"""
+        if kind == 'track':
+            yield self._metadata(await self._get(f"/tracks/{spotify_id}"))
+            return
+
+        album = await self._get(f"/albums/{spotify_id}") if kind == 'album' else None
+        url = f"/albums/{spotify_id}/tracks?limit=50" if kind == 'album' else f"/playlists/{spotify_id}/tracks?limit=100"
+        while url:
+            page = await self._get(url)
+            for item in page.get('items', []):
+                track = item.get('track', item) if kind == 'playlist' else item
+                # Episodios y pistas locales no tienen id reproducible
+                if track and track.get('id') and track.get('type', 'track') == 'track':
+                    yield self._metadata(track, album)
+            url = page.get('next')
+
+class SpotifyMatcher:
+    """Asocia cada canción de Spotify a un vídeo de YouTube y guarda el resultado en SQLite"""
+
+    def __init__(self):
+        self.inflight = {}
+
+    def cached(self, spotify_id: str):
+        cursor.execute("SELECT youtube_id, youtube_url, title, duration, thumbnail FROM spotify_tracks WHERE spotify_id = ?", (spotify_id,))
+        fila = cursor.fetchone()
+        if not fila:
+            return None
+        youtube_id, youtube_url, title, duration, thumbnail = fila
+        return {'id': youtube_id, 'webpage_url': youtube_url, 'title': title, 'duration': duration, 'thumbnail': thumbnail}
+
+    async def match(self, meta: dict):
+        """Devuelve la canción lista para la cola; solo busca en YouTube si no está en la tabla"""
+        song = self.cached(meta['spotify_id'])
+        if song:
+            return song
+
+        # Si otro servidor ya está buscando la misma canción, esperar su resultado
+        tarea = self.inflight.get(meta['spotify_id'])
+        if not tarea:
+            tarea = asyncio.ensure_future(self._buscar(meta))
+            self.inflight[meta['spotify_id']] = tarea
+            tarea.add_done_callback(lambda _: self.inflight.pop(meta['spotify_id'], None))
+
+        song = await asyncio.shield(tarea)
+        # Cada servidor recibe su propia copia para anotar quién la pidió
+        return dict(song) if song else None
+
+    async def _buscar(self, meta: dict):
+        data = await MusicPlayer.get_audio_source(f"{meta['artists']} - {meta['title']}")
+        if not data or not data.get('webpage_url'):
+            return None
+        # Sin la URL de stream: caduca antes de que suene una pista lejana en la cola
+        song = {
+            'id': data['id'],
+            'webpage_url': data['webpage_url'],
+            'title': data['title'],
+            'duration': data['duration'],
+            'thumbnail': meta['thumbnail'] or data['thumbnail'],
+        }
+        cursor.execute(
+            "REPLACE INTO spotify_tracks (spotify_id, youtube_id, youtube_url, title, duration, thumbnail) VALUES (?, ?, ?, ?, ?, ?)",
+            (meta['spotify_id'], song['id'], song['webpage_url'], song['title'], song['duration'], song['thumbnail'])
+        )
+        conn.commit()
+        return song
+
+spotify_client = SpotifyClient()
+spotify_matcher = SpotifyMatcher()
+
+async def encolar_spotify(ctx, query: str, processing_msg):
+    """Encola una canción, álbum o playlist de Spotify a medida que se van encontrando en YouTube"""
+    kind, spotify_id = SPOTIFY_URL_RE.search(query).groups()
+    if not spotify_client.configured:
+        return await processing_msg.edit(embed=discord.Embed(
+            title="❌ Spotify no disponible",
+            description="Faltan `SPOTIFY_CLIENT_ID` y `SPOTIFY_CLIENT_SECRET` en la configuración del bot.",
+            color=discord.Color.red()
+        ))
+
+    if not ctx.voice_client:
+        await ctx.author.voice.channel.connect()
+    queue = music_queue.get_queue(ctx.guild.id)
+    generacion = music_queue.generations.get(ctx.guild.id, 0)
+    semaforo = asyncio.Semaphore(SPOTIFY_MATCH_CONCURRENCY)
+    agregadas = fallidas = 0
+    primera = None
+
+    def detenida() -> bool:
+        # !stop o una desconexión vacían la cola: no seguir llenándola
+        return music_queue.generations.get(ctx.guild.id, 0) != generacion or not ctx.voice_client
+
+    async def buscar(meta):
+        async with semaforo:
+            return await spotify_matcher.match(meta)
+
+    async def encolar_lote(lote):
+        nonlocal agregadas, fallidas, primera
+        # Las búsquedas corren en paralelo, pero se encolan en el orden original
+        tareas = [asyncio.ensure_future(buscar(meta)) for meta in lote]
+        for tarea in tareas:
+            song = await tarea
+            if detenida():
+                for pendiente in tareas:
+                    pendiente.cancel()
+                return
+            if not song:
+                fallidas += 1
+                continue
+            song["requested_by"] = ctx.author.display_name
+            song["request_channel_id"] = ctx.channel.id
+            queue.append(song)
+            agregadas += 1
+            primera = primera or song
+            voice_client = ctx.voice_client
+            if not voice_client.is_playing() and not music_queue.get_playing(ctx.guild.id):
+                await play_next(ctx.guild.id)
+
+    try:
+        lote = []
+        async for meta in spotify_client.tracks(kind, spotify_id):
+            lote.append(meta)
+            if len(lote) >= SPOTIFY_MATCH_CONCURRENCY * 4:
+                await encolar_lote(lote)
+                lote = []
+            if detenida():
+                break
+        else:
+            await encolar_lote(lote)
+    except aiohttp.ClientError:
+        print(f"Error al leer Spotify: {traceback.format_exc()}")
+        if not agregadas:
+            return await processing_msg.edit(embed=discord.Embed(
+                title="❌ Error en la búsqueda",
+                description="No se pudo leer el enlace de Spotify.",
+                color=discord.Color.red()
+            ))
+
+    if detenida():
+        return await processing_msg.edit(embed=discord.Embed(
+            title="⏹️ Importación detenida",
+            description=f"Se detuvo la importación desde Spotify tras añadir {agregadas} canciones.",
+            color=discord.Color.blue()
+        ))
+
+    if not agregadas:
+        return await processing_msg.edit(embed=discord.Embed(
+            title="❌ Error en la búsqueda",
+            description="No se encontró ninguna de las canciones en YouTube.",
+            color=discord.Color.red()
+        ))
+
+    if kind == 'track':
+        embed = discord.Embed(
+            title="🎶 Canción añadida",
+            description=f"[{primera['title']}]({primera['webpage_url']})",
+            color=discord.Color.green()
+        )
+    else:
+        embed = discord.Embed(
+            title="🎶 Canciones añadidas desde Spotify",
+            description=f"Se añadieron **{agregadas}** canciones a la cola.",
+            color=discord.Color.green()
+        )
+        if fallidas:
+            embed.add_field(name="Sin resultado", value=str(fallidas), inline=True)
+    embed.set_thumbnail(url=primera.get('thumbnail') or 'https://i.imgur.com/8QZQZ.png')
+    await processing_msg.edit(embed=embed)
+
+# --------------------------
+# Watchdog de Streams
+# --------------------------
+
+# Segundos sin frames nuevos para dar un stream por colgado
+STALL_THRESHOLD = 15
+WATCHDOG_INTERVAL = 5
+
+class StreamWatchdog:
+    """Detecta streams que dejaron de entregar audio y fuerza su reinicio en la última posición"""
+
+    def __init__(self):
+        self.counts = {}
+
+    def registrar(self, guild_id: int, evento: str):
+        por_guild = self.counts.setdefault(guild_id, {'stalls': 0, 'recoveries': 0})
+        por_guild[evento] += 1
 
+    def totales(self) -> dict:
+        return {
+            evento: sum(c[evento] for c in self.counts.values())
+            for evento in ('stalls', 'recoveries')
+        }
 
+    async def run(self):
+        await bot.wait_until_ready()
+        while not bot.is_closed():
+            await asyncio.sleep(WATCHDOG_INTERVAL)
+            try:
+                await self.revisar()
+            except Exception:
+                print(f"Error en el watchdog: {traceback.format_exc()}")
+
+    async def revisar(self):
+        ahora = time.monotonic()
+        for voice_client in list(bot.voice_clients):
+            guild_id = voice_client.guild.id
+            source = music_queue.sources.get(guild_id)
+            if not source or source.stalled:
+                continue
+            if voice_client.is_paused():
+                # En pausa no se leen frames; no cuenta como bloqueo
+                source.last_frame_at = ahora
+                continue
+            if not voice_client.is_playing() or ahora - source.last_frame_at < STALL_THRESHOLD:
+                continue
+
+            print(f"Stream colgado en {guild_id} en {formatear_tiempo(source.position)}; reiniciando")
+            source.stalled = True
+            self.registrar(guild_id, 'stalls')
+            # Matar ffmpeg desbloquea el read() del reproductor; su callback `after`
+            # llama a play_next, que reanuda la pista en la última posición entregada
+            await bot.loop.run_in_executor(None, source.original.cleanup)
+
+stream_watchdog = StreamWatchdog()
+
+# Conexión SQLite; se abre en setup_hook para no retrasar el arranque
+conn = None
+cursor = None
+
+# Canciones por página en listados de playlists
+PAGE_SIZE = 10
+
+def init_database():
+    global conn, cursor
+    conn = sqlite3.connect("playlists.db")
+    cursor = conn.cursor()
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS playlists (
+        guild_id TEXT,
+        name TEXT,
+        songs TEXT,
+        PRIMARY KEY (guild_id, name)
+    )
+    """)
+    # Una fila por canción para paginar y editar sin cargar la playlist entera
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS playlist_songs (
+        guild_id TEXT,
+        playlist TEXT,
+        position INTEGER,
+        title TEXT,
+        data TEXT,
+        PRIMARY KEY (guild_id, playlist, position)
+    )
+    """)
+    # Correspondencia Spotify → YouTube compartida por todos los servidores
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS spotify_tracks (
+        spotify_id TEXT PRIMARY KEY,
+        youtube_id TEXT,
+        youtube_url TEXT,
+        title TEXT,
+        duration INTEGER,
+        thumbnail TEXT
+    )
+    """)
+    migrar_playlists_json()
+    conn.commit()
+
+def migrar_playlists_json():
+    """Pasa las playlists guardadas como JSON en `playlists.songs` a `playlist_songs`"""
+    cursor.execute("SELECT guild_id, name, songs FROM playlists WHERE songs IS NOT NULL")
+    for guild_id, nombre, songs in cursor.fetchall():
+        try:
+            canciones = json.loads(songs) if songs else []
+        except ValueError:
+            print(f"Playlist corrupta sin migrar: {guild_id}/{nombre}")
+            continue
+        insertar_canciones(guild_id, nombre, canciones)
+        cursor.execute("UPDATE playlists SET songs = NULL WHERE guild_id = ? AND name = ?", (guild_id, nombre))
+
+def insertar_canciones(guild_id: str, nombre: str, canciones: list):
+    """Añade canciones al final de una playlist"""
+    cursor.execute("SELECT COALESCE(MAX(position), 0) FROM playlist_songs WHERE guild_id = ? AND playlist = ?", (guild_id, nombre))
+    ultima = cursor.fetchone()[0]
+    cursor.executemany(
+        "INSERT INTO playlist_songs (guild_id, playlist, position, title, data) VALUES (?, ?, ?, ?, ?)",
+        [
+            (guild_id, nombre, ultima + i, c.get('title', 'Sin título'), json.dumps(c, ensure_ascii=False))
+            for i, c in enumerate(canciones, start=1)
+        ]
+    )
 
-# Inicializar conexión SQLite
-conn = sqlite3.connect("playlists.db")
-cursor = conn.cursor()
-cursor.execute("""
-CREATE TABLE IF NOT EXISTS playlists (
-    guild_id TEXT,
-    name TEXT,
-    songs TEXT,
-    PRIMARY KEY (guild_id, name)
-)
-""")
-conn.commit()
+def existe_playlist(guild_id: str, nombre: str) -> bool:
+    cursor.execute("SELECT 1 FROM playlists WHERE guild_id = ? AND name = ?", (guild_id, nombre))
+    return cursor.fetchone() is not None
+
+# Consultas por clave: cada página se lee a partir de la última clave mostrada,
+# sin OFFSET y sin traer el resto de filas
+
+def pagina_playlists(guild_id: str, despues=None, antes=None) -> list:
+    if antes is not None:
+        cursor.execute("SELECT name, name FROM playlists WHERE guild_id = ? AND name < ? ORDER BY name DESC LIMIT ?", (guild_id, antes, PAGE_SIZE))
+        return cursor.fetchall()[::-1]
+    cursor.execute("SELECT name, name FROM playlists WHERE guild_id = ? AND name > ? ORDER BY name LIMIT ?", (guild_id, despues or "", PAGE_SIZE))
+    return cursor.fetchall()
+
+def pagina_canciones(guild_id: str, nombre: str, despues=None, antes=None) -> list:
+    if antes is not None:
+        cursor.execute("SELECT position, title FROM playlist_songs WHERE guild_id = ? AND playlist = ? AND position < ? ORDER BY position DESC LIMIT ?", (guild_id, nombre, antes, PAGE_SIZE))
+        return cursor.fetchall()[::-1]
+    cursor.execute("SELECT position, title FROM playlist_songs WHERE guild_id = ? AND playlist = ? AND position > ? ORDER BY position LIMIT ?", (guild_id, nombre, despues or 0, PAGE_SIZE))
+    return cursor.fetchall()
+
+class KeysetPaginator:
+    """Listado numerado con ◀️/▶️ para avanzar o retroceder de página.
+
+    `cargar_pagina(despues=..., antes=...)` devuelve filas `(clave, texto)` ordenadas.
+    """
+
+    def __init__(self, ctx, titulo: str, cargar_pagina, vacio: str):
+        self.ctx = ctx
+        self.titulo = titulo
+        self.cargar_pagina = cargar_pagina
+        self.vacio = vacio
+        self.filas = []
+        self.numero_inicial = 1
+        self.pagina = 1
+        self.message = None
+
+    def construir_embed(self):
+        lineas = [f"`{i}.` {texto}" for i, (_, texto) in enumerate(self.filas, start=self.numero_inicial)]
+        embed = discord.Embed(title=self.titulo, description="\n".join(lineas), color=discord.Color.blurple())
+        embed.set_footer(text=f"Página {self.pagina} · ◀️ anterior / ▶️ siguiente")
+        return embed
+
+    def fila(self, numero: int):
+        """Fila `(clave, texto)` del número mostrado en la página visible, o None"""
+        indice = numero - self.numero_inicial
+        if 0 <= indice < len(self.filas):
+            return self.filas[indice]
+        return None
+
+    async def enviar(self) -> bool:
+        """Envía la primera página; devuelve False si no hay nada que listar"""
+        self.filas = self.cargar_pagina()
+        if not self.filas:
+            await self.ctx.send(self.vacio)
+            return False
+        self.message = await self.ctx.send(embed=self.construir_embed())
+        for emoji in ("◀️", "▶️"):
+            await self.message.add_reaction(emoji)
+        return True
+
+    async def navegar(self, timeout: float = 60.0):
+        controles = ["◀️", "▶️"]
+
+        def check_reaction(reaction, user):
+            return user == self.ctx.author and reaction.message.id == self.message.id and str(reaction.emoji) in controles
+
+        while True:
+            try:
+                reaction, user = await bot.wait_for("reaction_add", timeout=timeout, check=check_reaction)
+            except asyncio.TimeoutError:
+                return
+
+            if str(reaction.emoji) == "▶️":
+                nuevas = self.cargar_pagina(despues=self.filas[-1][0])
+                if nuevas:
+                    self.numero_inicial += len(self.filas)
+                    self.pagina += 1
+            else:
+                nuevas = self.cargar_pagina(antes=self.filas[0][0])
+                if nuevas:
+                    self.numero_inicial -= len(nuevas)
+                    self.pagina -= 1
+
+            if nuevas:
+                self.filas = nuevas
+                await self.message.edit(embed=self.construir_embed())
+            try:
+                await self.message.remove_reaction(reaction.emoji, user)
+            except discord.HTTPException:
+                pass
 
 @bot.command(name="renamepl")
 async def rename_playlist(ctx, *, argumentos: str):
@@ -169,19 +1154,15 @@ async def rename_playlist(ctx, *, argumentos: str):
         return await ctx.send("❌ Formato incorrecto. Usa: `!renamepl nombre_actual | nuevo_nombre`")
 
     guild_id = str(ctx.guild.id)
-    cursor.execute("SELECT songs FROM playlists WHERE guild_id = ? AND name = ?", (guild_id, nombre_actual))
-    resultado = cursor.fetchone()
-
-    if not resultado:
+    if not existe_playlist(guild_id, nombre_actual):
         return await ctx.send("❌ No se encontró esa playlist para renombrar.")
 
-    cursor.execute("SELECT 1 FROM playlists WHERE guild_id = ? AND name = ?", (guild_id, nuevo_nombre))
-    if cursor.fetchone():
+    if existe_playlist(guild_id, nuevo_nombre):
         return await ctx.send("⚠️ Ya existe una playlist con ese nombre.")
 
     try:
-        cursor.execute("DELETE FROM playlists WHERE guild_id = ? AND name = ?", (guild_id, nombre_actual))
-        cursor.execute("INSERT INTO playlists (guild_id, name, songs) VALUES (?, ?, ?)", (guild_id, nuevo_nombre, resultado[0]))
+        cursor.execute("UPDATE playlists SET name = ? WHERE guild_id = ? AND name = ?", (nuevo_nombre, guild_id, nombre_actual))
+        cursor.execute("UPDATE playlist_songs SET playlist = ? WHERE guild_id = ? AND playlist = ?", (nuevo_nombre, guild_id, nombre_actual))
         conn.commit()
 
         embed = discord.Embed(
@@ -192,6 +1173,7 @@ async def rename_playlist(ctx, *, argumentos: str):
         await ctx.send(embed=embed)
 
     except Exception as e:
+        conn.rollback()
         await ctx.send(embed=discord.Embed(
             title="❌ Error al renombrar",
             description=f"Ocurrió un error al renombrar la playlist: `{e}`",
@@ -209,31 +1191,34 @@ async def save_playlist(ctx, *, nombre: str):
     if not canciones:
         return await ctx.send("❌ No hay música en reproducción ni en cola para guardar.")
 
-    canciones_serializadas = json.dumps(canciones, ensure_ascii=False)
-
     try:
-        cursor.execute("REPLACE INTO playlists (guild_id, name, songs) VALUES (?, ?, ?)", (guild_id, nombre, canciones_serializadas))
+        cursor.execute("REPLACE INTO playlists (guild_id, name, songs) VALUES (?, ?, NULL)", (guild_id, nombre))
+        cursor.execute("DELETE FROM playlist_songs WHERE guild_id = ? AND playlist = ?", (guild_id, nombre))
+        insertar_canciones(guild_id, nombre, canciones)
         conn.commit()
         await ctx.send(f"✅ Playlist **{nombre}** guardada con {len(canciones)} canciones.")
     except Exception as e:
+        conn.rollback()
         return await ctx.send(f"❌ Error al guardar la playlist: `{e}`")
 
 @bot.command(name="loadpl")
 async def load_playlist(ctx, *, nombre: str):
     guild_id = str(ctx.guild.id)
-    cursor.execute("SELECT songs FROM playlists WHERE guild_id = ? AND name = ?", (guild_id, nombre))
-    resultado = cursor.fetchone()
-
-    if not resultado:
+    if not existe_playlist(guild_id, nombre):
         return await ctx.send("❌ No se encontró esa playlist.")
 
+    cursor.execute("SELECT data FROM playlist_songs WHERE guild_id = ? AND playlist = ? ORDER BY position", (guild_id, nombre))
     try:
-        lista = json.loads(resultado[0])
+        lista = [json.loads(fila[0]) for fila in cursor]
     except Exception as e:
         return await ctx.send("❌ La playlist está corrupta o vacía.")
 
+    # Las playlists con JSON corrupto se quedan sin migrar y no tienen canciones
+    if not lista:
+        return await ctx.send("❌ La playlist está corrupta o vacía.")
+
     queue = music_queue.get_queue(ctx.guild.id)
-    queue.extend([c.copy() for c in lista])
+    queue.extend(lista)
 
     await ctx.send(f"📂 Playlist **{nombre}** cargada con {len(lista)} canciones.")
 
@@ -244,61 +1229,60 @@ async def load_playlist(ctx, *, nombre: str):
 @bot.command(name="listpl")
 async def listar_playlists(ctx):
     guild_id = str(ctx.guild.id)
-    cursor.execute("SELECT name FROM playlists WHERE guild_id = ?", (guild_id,))
-    resultados = cursor.fetchall()
-
-    if not resultados:
-        return await ctx.send("📭 No hay playlists guardadas.")
-
-    nombres = [f"- {r[0]}" for r in resultados]
-    mensaje = "🎶 **Playlists guardadas:**\n" + "\n".join(nombres)
-    await ctx.send(mensaje)
+    listado = KeysetPaginator(
+        ctx,
+        "🎶 Playlists guardadas",
+        lambda **k: pagina_playlists(guild_id, **k),
+        "📭 No hay playlists guardadas."
+    )
+    if await listado.enviar():
+        await listado.navegar()
 
 @bot.command(name="delpl")
 async def eliminar_playlist(ctx, *, nombre: str):
     guild_id = str(ctx.guild.id)
-    cursor.execute("SELECT 1 FROM playlists WHERE guild_id = ? AND name = ?", (guild_id, nombre))
-    if not cursor.fetchone():
+    if not existe_playlist(guild_id, nombre):
         return await ctx.send("❌ No se encontró esa playlist para eliminar.")
 
     try:
         cursor.execute("DELETE FROM playlists WHERE guild_id = ? AND name = ?", (guild_id, nombre))
+        cursor.execute("DELETE FROM playlist_songs WHERE guild_id = ? AND playlist = ?", (guild_id, nombre))
         conn.commit()
         await ctx.send(f"🗑️ Playlist **{nombre}** eliminada correctamente.")
     except Exception as e:
+        conn.rollback()
         return await ctx.send(f"❌ Error al eliminar la playlist: `{e}`")
 
 @bot.command(name="editpl")
 async def editar_playlist(ctx):
     guild_id = str(ctx.guild.id)
 
-    # Obtener todas las playlists disponibles
-    cursor.execute("SELECT name FROM playlists WHERE guild_id = ?", (guild_id,))
-    listas = cursor.fetchall()
-
-    if not listas:
-        return await ctx.send("📭 No hay playlists guardadas para editar.")
-
-    opciones = [r[0] for r in listas]
-    lista_str = "\n".join([f"{i+1}. {n}" for i, n in enumerate(opciones)])
-
-    await ctx.send(f"📚 **Playlists disponibles:**\n{lista_str}\n\nResponde con el número de la playlist que deseas editar:")
+    # Mostrar las playlists disponibles por páginas mientras se espera la elección
+    listado = KeysetPaginator(
+        ctx,
+        "📚 Playlists disponibles",
+        lambda **k: pagina_playlists(guild_id, **k),
+        "📭 No hay playlists guardadas para editar."
+    )
+    if not await listado.enviar():
+        return
+    navegacion = bot.loop.create_task(listado.navegar(timeout=30.0))
+    await ctx.send("Responde con el número de la playlist que deseas editar:")
 
     def check(m):
         return m.author == ctx.author and m.channel == ctx.channel and m.content.isdigit()
 
     try:
         msg = await bot.wait_for("message", timeout=30.0, check=check)
-        index = int(msg.content) - 1
-        if index < 0 or index >= len(opciones):
-            return await ctx.send("❌ Número inválido.")
-        nombre = opciones[index]
+        # El número se resuelve con la página visible, sin consultar por posición
+        fila = listado.fila(int(msg.content))
+        if not fila:
+            return await ctx.send("❌ Número inválido. Elige uno de la página visible.")
+        nombre = fila[0]
     except asyncio.TimeoutError:
         return await ctx.send("⌛ Tiempo agotado.")
-
-    cursor.execute("SELECT songs FROM playlists WHERE guild_id = ? AND name = ?", (guild_id, nombre))
-    resultado = cursor.fetchone()
-    canciones = json.loads(resultado[0]) if resultado else []
+    finally:
+        navegacion.cancel()
 
     embed = discord.Embed(
         title=f"🛠 Editar Playlist: {nombre}",
@@ -325,43 +1309,42 @@ async def editar_playlist(ctx):
         return await ctx.send("⌛ Tiempo agotado.")
 
     emoji = str(reaction.emoji)
+    cargar_canciones = lambda **k: pagina_canciones(guild_id, nombre, **k)
 
     if emoji == "1️⃣":
-        if not canciones:
-            return await ctx.send("🎵 Esta playlist está vacía.")
-        lista = "\n".join([f"{i+1}. {c['title']}" for i, c in enumerate(canciones)])
-        return await ctx.send(f"🎼 **Canciones en {nombre}:**\n{lista}")
+        listado = KeysetPaginator(ctx, f"🎼 Canciones en {nombre}", cargar_canciones, "🎵 Esta playlist está vacía.")
+        if await listado.enviar():
+            await listado.navegar()
 
     elif emoji == "2️⃣":
-        if not canciones:
-            return await ctx.send("🎵 Esta playlist está vacía.")
-        lista = "\n".join([f"{i+1}. {c['title']}" for i, c in enumerate(canciones)])
-        await ctx.send(f"🎯 ¿Qué canción deseas eliminar?\n{lista}\nResponde con un número del 1 al {len(canciones)}:")
+        listado = KeysetPaginator(ctx, "🎯 ¿Qué canción deseas eliminar?", cargar_canciones, "🎵 Esta playlist está vacía.")
+        if not await listado.enviar():
+            return
+        navegacion = bot.loop.create_task(listado.navegar(timeout=30.0))
+        await ctx.send("Responde con el número de la canción:")
 
         def check_msg(m):
             return m.author == ctx.author and m.channel == ctx.channel and m.content.isdigit()
 
         try:
             msg = await bot.wait_for("message", timeout=30.0, check=check_msg)
-            index = int(msg.content) - 1
-            if 0 <= index < len(canciones):
-                eliminada = canciones.pop(index)
-                canciones_serializadas = json.dumps(canciones, ensure_ascii=False)
-                cursor.execute("UPDATE playlists SET songs = ? WHERE guild_id = ? AND name = ?", (canciones_serializadas, guild_id, nombre))
+            fila = listado.fila(int(msg.content))
+            if fila:
+                cursor.execute("DELETE FROM playlist_songs WHERE guild_id = ? AND playlist = ? AND position = ?", (guild_id, nombre, fila[0]))
                 conn.commit()
-                await ctx.send(f"🗑️ Canción **{eliminada['title']}** eliminada.")
+                await ctx.send(f"🗑️ Canción **{fila[1]}** eliminada.")
             else:
-                await ctx.send("⚠️ Número fuera de rango.")
+                await ctx.send("⚠️ Número fuera de la página visible.")
         except asyncio.TimeoutError:
             await ctx.send("⌛ Tiempo agotado.")
+        finally:
+            navegacion.cancel()
 
     elif emoji == "3️⃣":
         nuevas = [c.copy() for c in music_queue.get_queue(ctx.guild.id)]
         if not nuevas:
             return await ctx.send("❌ No hay canciones en cola.")
-        canciones.extend(nuevas)
-        canciones_serializadas = json.dumps(canciones, ensure_ascii=False)
-        cursor.execute("UPDATE playlists SET songs = ? WHERE guild_id = ? AND name = ?", (canciones_serializadas, guild_id, nombre))
+        insertar_canciones(guild_id, nombre, nuevas)
         conn.commit()
         await ctx.send(f"➕ Se agregaron {len(nuevas)} canciones desde la cola.")
 
@@ -373,15 +1356,13 @@ async def editar_playlist(ctx):
 
         try:
             msg = await bot.wait_for("message", timeout=45.0, check=check_url)
-            with yt_dlp.YoutubeDL({'quiet': True}) as ydl:
-                info = ydl.extract_info(msg.content, download=False)
-                cancion = {
-                    "title": info.get('title', 'Sin título'),
-                    "url": msg.content
-                }
-            canciones.append(cancion)
-            canciones_serializadas = json.dumps(canciones, ensure_ascii=False)
-            cursor.execute("UPDATE playlists SET songs = ? WHERE guild_id = ? AND name = ?", (canciones_serializadas, guild_id, nombre))
+            # Importa yt-dlp y extrae en el executor, sin bloquear el event loop
+            info = await hedged_extractor.extract(msg.content)
+            cancion = {
+                "title": info.get('title', 'Sin título'),
+                "url": msg.content
+            }
+            insertar_canciones(guild_id, nombre, [cancion])
             conn.commit()
             await ctx.send(f"🎵 Canción **{cancion['title']}** agregada.")
         except Exception as e:
@@ -396,6 +1377,65 @@ async def editar_playlist(ctx):
 # Funciones de Reproducción
 # --------------------------
 
+def debe_reanudar(guild_id: int, song: dict, source: PositionTrackedSource, error) -> bool:
+    """Indica si la pista se cortó antes de tiempo y conviene retomarla en su posición"""
+    if music_queue.resume_attempts.get(guild_id, 0) >= MAX_RESUME_ATTEMPTS:
+        return False
+    if error or source.stalled:
+        return True
+    duration = song.get('duration') or 0
+    if source.end_at is not None:
+        duration = min(duration, source.end_at) if duration else source.end_at
+    return source.reached_eof and duration > 0 and source.position < duration - RESUME_MARGIN
+
+async def resolver_stream(song: dict):
+    """Obtiene la URL de stream de una canción encolada solo con su página (p. ej. desde Spotify)"""
+    data = await MusicPlayer.get_audio_source(song['webpage_url'])
+    if not data:
+        raise RuntimeError(f"No se pudo obtener el stream de {song['webpage_url']}")
+    song['url'] = data['url']
+    song['duration'] = song.get('duration') or data['duration']
+    # El recorte final se aplica a la pista en curso cuando termine el análisis
+    silence_analyzer.submit(song)
+
+async def refrescar_url(song: dict) -> bool:
+    """Pide una URL de stream nueva; las de googlevideo caducan"""
+    origen = song.get('webpage_url')
+    if not origen:
+        return False
+    data = await MusicPlayer.get_audio_source(origen)
+    if not data:
+        return False
+    song['url'] = data['url']
+    return True
+
+def opus_disponible() -> bool:
+    """discord.py carga libopus al crear el primer codificador; sin él no hay ruta PCM"""
+    if discord.opus.is_loaded():
+        return True
+    try:
+        discord.opus.Encoder()
+    except discord.opus.OpusNotLoaded:
+        return False
+    return discord.opus.is_loaded()
+
+def preparar_codificador(voice_client, guild_id: int):
+    """Crea el codificador del VoiceClient para la ruta PCM y le aplica el bitrate del gobernador"""
+    # El VoiceClient solo crea su codificador si la fuente empieza en PCM, y una
+    # fuente opus puede pasar a PCM a mitad de pista al cambiar el volumen
+    if not voice_client.encoder:
+        voice_client.encoder = discord.opus.Encoder()
+    decision = encoding_governor.decisions.get(guild_id)
+    if decision:
+        voice_client.encoder.set_bitrate(decision['bitrate'])
+
+def reproducir_fuente(voice_client, guild_id: int, source: PositionTrackedSource):
+    if voice_client.encoder or music_queue.volumes.get(guild_id, 100) != 100:
+        preparar_codificador(voice_client, guild_id)
+    music_queue.sources[guild_id] = source
+    music_queue.set_playing(guild_id, True)
+    voice_client.play(source, after=lambda e: asyncio.run_coroutine_threadsafe(play_next(guild_id, e), bot.loop))
+
 async def play_next(guild_id: int, error=None):
     voice_client = discord.utils.get(bot.voice_clients, guild=bot.get_guild(guild_id))
     
@@ -403,28 +1443,57 @@ async def play_next(guild_id: int, error=None):
         print(f"Error en reproducción: {error}")
         music_queue.set_playing(guild_id, False)
     
+    previous = music_queue.sources.pop(guild_id, None)
+    offset = music_queue.pending_seek.pop(guild_id, None)
+
     if not voice_client or not voice_client.is_connected():
         music_queue.set_playing(guild_id, False)
+        encoding_governor.forget(guild_id)
         return
 
+    # Reiniciar la pista actual tras un salto (!seek) o un corte del stream
+    current = music_queue.current.get(guild_id)
+    if current and offset is None and previous and debe_reanudar(guild_id, current, previous, error):
+        music_queue.resume_attempts[guild_id] = music_queue.resume_attempts.get(guild_id, 0) + 1
+        # Un corte suele deberse a una URL caducada: reanudar siempre con una nueva.
+        # Si no hay URL nueva y no llegó a sonar nada, reintentar con la misma no sirve
+        if await refrescar_url(current) or previous.frames > 0:
+            offset = previous.position
+            print(f"Reanudando {current['title']} en {formatear_tiempo(offset)}")
+        else:
+            print(f"No se pudo renovar el stream de {current['title']}; pasando a la siguiente")
+
+    if current and offset is not None:
+        try:
+            source = await crear_fuente(voice_client, current, offset)
+            reproducir_fuente(voice_client, guild_id, source)
+            if previous and previous.stalled:
+                stream_watchdog.registrar(guild_id, 'recoveries')
+            return
+        except Exception:
+            print(f"Error al reanudar: {traceback.format_exc()}")
+
     queue = music_queue.get_queue(guild_id)
     
     if not queue:
         music_queue.set_playing(guild_id, False)
+        # Sin stream activo: que !encoder no lo siga contando
+        encoding_governor.forget(guild_id)
         return
     
     next_song = queue.popleft()
     music_queue.current[guild_id] = next_song
+    music_queue.resume_attempts[guild_id] = 0
     music_queue.set_playing(guild_id, True)
+    # Analizar ya la siguiente para que su recorte esté listo al empezar
+    if queue:
+        silence_analyzer.submit(queue[0])
     
     try:
-        source = await discord.FFmpegOpusAudio.from_probe(
-            next_song['url'],
-            **FFMPEG_OPTIONS,
-            method='fallback'
-        )
-        
-        voice_client.play(source, after=lambda e: asyncio.run_coroutine_threadsafe(play_next(guild_id, e), bot.loop))
+        if not next_song.get('url'):
+            await resolver_stream(next_song)
+        source = await crear_fuente(voice_client, next_song, silence_analyzer.trim_start(next_song))
+        reproducir_fuente(voice_client, guild_id, source)
         
         guild = bot.get_guild(guild_id)
         text_channel = next((channel for channel in guild.text_channels if channel.id == next_song.get('request_channel_id')), None)
@@ -470,6 +1539,9 @@ async def play(ctx, *, query: str):
             color=discord.Color.orange()
         )
         processing_msg = await ctx.send(embed=processing_embed)
+
+        if SPOTIFY_URL_RE.search(query):
+            return await encolar_spotify(ctx, query, processing_msg)
         
         data = await MusicPlayer.get_audio_source(query)
         if not data:
@@ -487,6 +1559,7 @@ async def play(ctx, *, query: str):
         
         queue = music_queue.get_queue(ctx.guild.id)
         queue.append(data)
+        silence_analyzer.submit(data)
 
         # Crear embed de respuesta
         embed = discord.Embed(
@@ -649,6 +1722,104 @@ async def resume(ctx):
         )
         await ctx.send(embed=embed)
 
+async def saltar_a(ctx, destino: float):
+    """Reinicia la pista actual en `destino` segundos sin decodificar lo anterior"""
+    voice_client = ctx.voice_client
+    current = music_queue.current.get(ctx.guild.id)
+    if not voice_client or not current or not (voice_client.is_playing() or voice_client.is_paused()):
+        embed = discord.Embed(
+            title="🚨 Error de Comando",
+            description="No hay música reproduciéndose actualmente.",
+            color=discord.Color.red()
+        )
+        return await ctx.send(embed=embed)
+
+    duration = current.get('duration') or 0
+    destino = max(destino, 0)
+    if duration and destino >= duration:
+        embed = discord.Embed(
+            title="🚨 Posición inválida",
+            description=f"La canción dura {formatear_tiempo(duration)}.",
+            color=discord.Color.red()
+        )
+        return await ctx.send(embed=embed)
+
+    # play_next detecta el salto pendiente y recrea la fuente en esa posición
+    music_queue.pending_seek[ctx.guild.id] = destino
+    voice_client.stop()
+
+    embed = discord.Embed(
+        title="⏩ Posición cambiada",
+        description=f"Reproduciendo **{current['title']}** desde {formatear_tiempo(destino)}.",
+        color=discord.Color.blue()
+    )
+    await ctx.send(embed=embed)
+
+@bot.command(name="seek")
+async def seek(ctx, posicion: str):
+    """Salta a una posición de la canción actual (segundos o mm:ss)"""
+    try:
+        destino = parsear_tiempo(posicion)
+    except ValueError:
+        return await ctx.send("❌ Formato incorrecto. Usa: `!seek 90` o `!seek 1:30`")
+    await saltar_a(ctx, destino)
+
+@bot.command(name="forward", aliases=["ff"])
+async def forward(ctx, segundos: int = 10):
+    """Adelanta la canción actual"""
+    await saltar_a(ctx, music_queue.get_position(ctx.guild.id) + segundos)
+
+@bot.command(name="rewind", aliases=["rw"])
+async def rewind(ctx, segundos: int = 10):
+    """Retrocede la canción actual"""
+    await saltar_a(ctx, music_queue.get_position(ctx.guild.id) - segundos)
+
+@bot.command(name="volume", aliases=["vol"])
+async def volume(ctx, nivel: int = None):
+    """Ajusta el volumen (1-100) sin reiniciar la canción"""
+    actual = music_queue.volumes.get(ctx.guild.id, 100)
+    if nivel is None:
+        return await ctx.send(f"🔊 Volumen actual: **{actual}%**")
+
+    if not 1 <= nivel <= 100:
+        embed = discord.Embed(
+            title="🚨 Volumen inválido",
+            description="El volumen debe estar entre 1 y 100.",
+            color=discord.Color.red()
+        )
+        return await ctx.send(embed=embed)
+
+    if nivel != 100 and not NUMPY_AVAILABLE:
+        embed = discord.Embed(
+            title="🚨 Volumen no disponible",
+            description="El control de volumen necesita NumPy instalado en el servidor del bot.",
+            color=discord.Color.red()
+        )
+        return await ctx.send(embed=embed)
+
+    if nivel != 100 and not opus_disponible():
+        embed = discord.Embed(
+            title="🚨 Volumen no disponible",
+            description="El control de volumen necesita libopus instalado en el servidor del bot.",
+            color=discord.Color.red()
+        )
+        return await ctx.send(embed=embed)
+
+    if nivel != 100 and ctx.voice_client:
+        preparar_codificador(ctx.voice_client, ctx.guild.id)
+
+    music_queue.volumes[ctx.guild.id] = nivel
+    source = music_queue.sources.get(ctx.guild.id)
+    if source:
+        source.gain.set_volume(nivel / 100)
+
+    embed = discord.Embed(
+        title="🔊 Volumen ajustado",
+        description=f"Volumen: **{actual}%** → **{nivel}%**",
+        color=discord.Color.blue()
+    )
+    await ctx.send(embed=embed)
+
 @bot.command(name="nowplaying", aliases=["np"])
 async def nowplaying(ctx):
     """Muestra la canción actual"""
@@ -656,12 +1827,18 @@ async def nowplaying(ctx):
         current_song = music_queue.current[ctx.guild.id]
         embed = discord.Embed(
             title="🎵 Reproduciendo ahora",
-            description=f"[{current_song['title']}]({current_song['url']})",
+            description=f"[{current_song['title']}]({current_song.get('url') or current_song.get('webpage_url')})",
             color=discord.Color.blurple()
         )
         embed.set_thumbnail(url=current_song.get('thumbnail', 'https://i.imgur.com/8QZQZ.png'))
         embed.add_field(name="Duración", value=f"{current_song['duration']//60}:{current_song['duration']%60:02}", inline=True)
         embed.add_field(name="Solicitado por", value=current_song.get('requested_by', 'Desconocido'), inline=True)
+        elapsed = music_queue.get_position(ctx.guild.id)
+        progreso = formatear_tiempo(elapsed)
+        if current_song['duration']:
+            restante = current_song['duration'] - elapsed
+            progreso += f" / {formatear_tiempo(current_song['duration'])} (quedan {formatear_tiempo(restante)})"
+        embed.add_field(name="Progreso", value=progreso, inline=False)
         await ctx.send(embed=embed)
     else:
         queue = music_queue.get_queue(ctx.guild.id)
@@ -788,6 +1965,95 @@ async def mostrar_changelog(ctx):
     await ctx.send(embed=embed)
 
 
+@bot.command(name="encoder")
+async def mostrar_encoder(ctx):
+    """Muestra la carga del host y las decisiones del gobernador de codificación"""
+    embed = discord.Embed(
+        title="🎛️ Estado del codificador",
+        description=f"CPU del host: **{encoding_governor.host_load():.0f}%** · Streams activos: **{len(encoding_governor.decisions)}**",
+        color=discord.Color.blurple()
+    )
+
+    decision = encoding_governor.decisions.get(ctx.guild.id)
+    if decision:
+        filtros = ", ".join(f.split("=", 1)[0] for f in decision['filtros']) or "ninguno"
+        embed.add_field(
+            name="Este servidor",
+            value=(
+                f"Nivel: `{decision['nivel']}`\n"
+                f"Bitrate: `{decision['bitrate']} kbps` · Complejidad: `{decision['complejidad']}`\n"
+                f"Filtros: `{filtros}` · CPU al decidir: `{decision['cpu']:.0f}%`"
+            ),
+            inline=False
+        )
+    else:
+        embed.add_field(name="Este servidor", value="Sin stream activo.", inline=False)
+
+    resumen = {}
+    for d in encoding_governor.decisions.values():
+        resumen[d['nivel']] = resumen.get(d['nivel'], 0) + 1
+    if resumen:
+        embed.add_field(name="Streams por nivel", value="\n".join(f"`{n}`: {c}" for n, c in resumen.items()), inline=False)
+
+    await ctx.send(embed=embed)
+
+
+@bot.command(name="extractor")
+async def mostrar_extractor(ctx):
+    """Muestra las latencias de extracción por cliente y la tasa de respaldos"""
+    embed = discord.Embed(
+        title="📡 Extracción de audio",
+        description=(
+            f"Plazo para el respaldo: **{hedged_extractor.deadline():.1f} s** · "
+            f"Respaldos recientes: **{hedged_extractor.hedge_rate():.0%}** (máx. {HEDGE_MAX_RATE:.0%})"
+        ),
+        color=discord.Color.blurple()
+    )
+    etiquetas = [f"≤{limite:g}s" if limite != float('inf') else f">{LATENCY_BUCKETS[-2]:g}s" for limite in LATENCY_BUCKETS]
+    for strategy in EXTRACTION_STRATEGIES:
+        histograma = " ".join(f"{e}:{n}" for e, n in zip(etiquetas, hedged_extractor.histogramas[strategy]))
+        embed.add_field(
+            name=f"Cliente `{strategy}`",
+            value=(
+                f"Ganadas: {hedged_extractor.victorias[strategy]} · Errores: {hedged_extractor.errores[strategy]}\n"
+                f"`{histograma}`"
+            ),
+            inline=False
+        )
+    await ctx.send(embed=embed)
+
+
+@bot.command(name="health")
+async def mostrar_salud(ctx):
+    """Muestra los bloqueos de stream detectados y las recuperaciones"""
+    totales = stream_watchdog.totales()
+    locales = stream_watchdog.counts.get(ctx.guild.id, {'stalls': 0, 'recoveries': 0})
+    embed = discord.Embed(
+        title="🩺 Salud de los streams",
+        description=f"Umbral de bloqueo: **{STALL_THRESHOLD} s** sin audio",
+        color=discord.Color.blurple()
+    )
+    embed.add_field(name="Este servidor", value=f"Bloqueos: {locales['stalls']} · Recuperados: {locales['recoveries']}", inline=False)
+    embed.add_field(name="Total", value=f"Bloqueos: {totales['stalls']} · Recuperados: {totales['recoveries']}", inline=False)
+
+    source = music_queue.sources.get(ctx.guild.id)
+    if source:
+        embed.add_field(name="Último frame", value=f"hace {time.monotonic() - source.last_frame_at:.1f} s", inline=False)
+    await ctx.send(embed=embed)
+
+
+@bot.command(name="startup")
+async def mostrar_arranque(ctx):
+    """Muestra el tiempo de arranque del bot por fases"""
+    embed = discord.Embed(
+        title="⏱️ Perfil de arranque",
+        description=f"```\n{startup_profiler.reporte()}\n```",
+        color=discord.Color.blurple()
+    )
+    embed.set_footer(text=f"Precarga de extractores: {EXTRACTOR_PRELOAD}")
+    await ctx.send(embed=embed)
+
+
 @bot.command(name="comandos")
 async def mostrar_comandos(ctx):
     embed = discord.Embed(
@@ -805,7 +2071,9 @@ async def mostrar_comandos(ctx):
             ("!resume", "Reanuda la canción pausada."),
             ("!skip", "Salta a la siguiente canción en la cola."),
             ("!stop", "Detiene la reproducción y sale del canal de voz."),
-            ("!volume <1-100>", "Ajusta el volumen del bot."),
+            ("!seek <mm:ss>", "Salta a una posición de la canción actual."),
+            ("!forward / !rewind [segundos]", "Adelanta o retrocede la canción actual (10 s por defecto)."),
+            ("!volume <1-100>", "Ajusta el volumen del bot al instante, sin reiniciar la canción."),
             ("!queue", "Muestra la cola de reproducción actual."),
             ("!shuffle", "Mezcla aleatoriamente el orden de las canciones en la cola."),
             ("!nowplaying / !np", "Muestra información de la canción que se está reproduciendo actualmente."),
@@ -820,6 +2088,10 @@ async def mostrar_comandos(ctx):
         ],
         "⚙️ Utilidades": [
             ("!comandos", "Muestra este mensaje."),
+            ("!encoder", "Muestra la carga del host y la calidad de audio elegida."),
+            ("!startup", "Muestra el tiempo de arranque del bot por fases."),
+            ("!extractor", "Muestra las latencias de búsqueda y los respaldos lanzados."),
+            ("!health", "Muestra los cortes de audio detectados y recuperados."),
             ("!changelog", "Muestra los últimos cambios realizados en el bot.")
         ]
     }
@@ -850,9 +2122,38 @@ async def on_voice_state_update(member, before, after):
     if before.channel and not after.channel:
         music_queue.clear(before.channel.guild.id)
 
+def precargar_extractor():
+    """Importa yt-dlp y carga el extractor de YouTube antes de la primera búsqueda"""
+    try:
+        with startup_profiler.fase("precarga extractor"):
+            yt_dlp = get_yt_dlp()
+            with yt_dlp.YoutubeDL(get_ydl_opts()) as ydl:
+                ydl.get_info_extractor('Youtube')
+    except Exception:
+        print(f"Error al precargar extractores: {traceback.format_exc()}")
+
+@bot.event
+async def setup_hook():
+    with startup_profiler.fase("límites de archivos"):
+        increase_file_limits()
+    with startup_profiler.fase("base de datos"):
+        init_database()
+    bot.loop.create_task(stream_watchdog.run())
+
+_ready_once = False
+
 @bot.event
 async def on_ready():
+    global _ready_once
     print(f"✅ Bot listo como {bot.user}")
+    if not _ready_once:
+        _ready_once = True
+        startup_profiler.marcar("total hasta READY")
+        # psutil se importa aquí, ya conectados al gateway
+        bot.loop.create_task(encoding_governor.run())
+        print(f"⏱️ Arranque:\n{startup_profiler.reporte()}")
+        if EXTRACTOR_PRELOAD == "ready":
+            bot.loop.run_in_executor(None, precargar_extractor)
     await bot.change_presence(activity=discord.Activity(
     type=discord.ActivityType.playing,
     name="!comandos"
@@ -861,4 +2162,8 @@ async def on_ready():
 # Ejecución del Bot
 # --------------------------
 
-bot.run(os.getenv("TOKEN"))
+if __name__ == "__main__":
+    if "--bench-volume" in sys.argv:
+        print(benchmark_gain_stage())
+    else:
+        bot.run(os.getenv("TOKEN"))